@@ -1,17 +1,74 @@
 #!/usr/bin/env python3
 
-import json
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from urllib.parse import urlparse
 import sys
 import time
 from datetime import datetime, timedelta
 import re
+import operator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Maximum number of CT log servers queried concurrently
+MAX_STH_WORKERS = 32
+
+# Last CT logs file found by get_latest_ct_logs_url, and how long to trust it
+LATEST_CT_LOGS_CACHE = Path("cache") / "latest_ct_logs.json"
+LATEST_CT_LOGS_TTL = 60 * 60  # seconds
+
+def _make_session():
+    """Create a requests Session with a pooled, retrying HTTPS adapter."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504]),
+    )
+    session.mount('https://', adapter)
+    return session
+
+_SESSION = _make_session()
+
+def get_session():
+    """Return the shared requests Session used for all HTTP requests."""
+    return _SESSION
+
+def load_latest_ct_logs_hint():
+    """Return the cached CT logs URL if it was found recently and still exists."""
+    try:
+        with open(LATEST_CT_LOGS_CACHE, 'rb') as f:
+            hint = orjson.loads(f.read())
+        if time.time() - hint['checked_at'] > LATEST_CT_LOGS_TTL:
+            return None
+        response = _SESSION.head(hint['url'], timeout=5)
+        if response.status_code == 200:
+            return hint['url']
+    except (OSError, ValueError, KeyError, TypeError, requests.RequestException):
+        pass
+    return None
+
+def save_latest_ct_logs_hint(date_str, version, url):
+    """Remember the CT logs file found by get_latest_ct_logs_url."""
+    try:
+        LATEST_CT_LOGS_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        with open(LATEST_CT_LOGS_CACHE, 'wb') as f:
+            f.write(orjson.dumps({'date': date_str, 'version': version, 'url': url, 'checked_at': time.time()}))
+    except OSError:
+        pass
 
 def get_latest_ct_logs_url():
     """Find and return the URL of the most recent CT logs JSON file."""
     base_url = "https://storage.googleapis.com/crlite-filters-prod"
     
+    # A file found within the last LATEST_CT_LOGS_TTL seconds is still current
+    url = load_latest_ct_logs_hint()
+    if url:
+        return url
+    
     # Start from today and go backwards until we find a valid file
     current_date = datetime.now()
     max_attempts = 7  # Look back up to 7 days
@@ -23,8 +80,9 @@ def get_latest_ct_logs_url():
             url = f"{base_url}/{date_str}-{version}/ct-logs.json"
             
             try:
-                response = requests.head(url, timeout=5)
+                response = _SESSION.head(url, timeout=5)
                 if response.status_code == 200:
+                    save_latest_ct_logs_hint(date_str, version, url)
                     return url
             except requests.RequestException:
                 continue
@@ -37,12 +95,12 @@ def get_latest_ct_logs_url():
 def download_ct_logs(url):
     """Download and parse the CT logs JSON file from the given URL."""
     try:
-        response = requests.get(url, timeout=30)
+        response = _SESSION.get(url, timeout=30)
         response.raise_for_status()
-        return response.json()
+        return orjson.loads(response.content)
     except requests.RequestException as e:
         raise Exception(f"Failed to download CT logs: {str(e)}")
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         raise Exception(f"Invalid JSON in downloaded file: {str(e)}")
 
 def get_sth(log_url):
@@ -57,9 +115,9 @@ def get_sth(log_url):
             log_url = f'{log_url.rstrip("/")}/ct/v1/get-sth'
         
         # Make request with timeout
-        response = requests.get(log_url, timeout=10)
+        response = _SESSION.get(log_url, timeout=10)
         response.raise_for_status()
-        return response.json()
+        return orjson.loads(response.content)
     except Exception as e:
         return None
 
@@ -117,41 +175,49 @@ def process_log(log_entry):
         'error': None
     }
 
+def get_ct_log_data():
+    """Find the most recent CT logs file, query every log's STH and return the lag of each log."""
+    # Get the URL of the most recent CT logs file
+    print("Finding most recent CT logs file...", file=sys.stderr)
+    logs_url = get_latest_ct_logs_url()
+    print(f"Downloading from: {logs_url}", file=sys.stderr)
+
+    # Download and parse the JSON file
+    logs = download_ct_logs(logs_url)
+
+    print(f"Processing {len(logs)} CT logs...", file=sys.stderr)
+
+    results = []
+    logs.sort(key=operator.itemgetter('ShortURL'))
+    # Each log lives on a different server, so fetch the STHs concurrently
+    with ThreadPoolExecutor(max_workers=MAX_STH_WORKERS) as executor:
+        processed = list(executor.map(process_log, logs))
+    for result in processed:
+        if result is None:
+            continue
+
+        entry_lag = max(int(result['tree_size']) - 1, 0) - int(result['max_entry']) if result['tree_size'] != 'N/A' else 'N/A'
+        results.append({
+            'url': result['short_url'],
+            'entry_lag': entry_lag,
+            'time_diff': result['time_diff'],
+            'tree_size': result['tree_size'],
+            'error': result['error']
+        })
+    
+    return results
+
 def main():
     try:
-        # Get the URL of the most recent CT logs file
-        print("Finding most recent CT logs file...", file=sys.stderr)
-        logs_url = get_latest_ct_logs_url()
-        print(f"Downloading from: {logs_url}", file=sys.stderr)
-        
-        # Download and parse the JSON file
-        logs = download_ct_logs(logs_url)
-        
-        print(f"Processing {len(logs)} CT logs...", file=sys.stderr)
-        
-        results = []
-        logs.sort(key=lambda x: x["ShortURL"])
-        for log in logs:
-            result = process_log(log)
-            if result is None:
-                continue
-            
-            entry_lag = max(int(result['tree_size']) - 1, 0) - int(result['max_entry']) if result['tree_size'] != 'N/A' else 'N/A'
-            results.append({
-                'url': result['short_url'],
-                'entry_lag': entry_lag,
-                'time_diff': result['time_diff'],
-                'tree_size': result['tree_size'],
-                'error': result['error']
-            })
+        results = get_ct_log_data()
         
         # Output JSON to stdout
-        print(json.dumps(results, indent=2))
+        print(orjson.dumps(results, option=orjson.OPT_INDENT_2).decode())
                 
     except FileNotFoundError:
         print("Error: ct-logs.json not found", file=sys.stderr)
         sys.exit(1)
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         print("Error: Invalid JSON in ct-logs.json", file=sys.stderr)
         sys.exit(1)
     except Exception as e:
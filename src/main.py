@@ -1,34 +1,73 @@
 import sys
-import json
+import argparse
+import ijson
+import orjson
+import jinja2
+from markupsafe import Markup
 import requests
 import re
-from typing import Dict, List, Any, Tuple, Optional
+from typing import Dict, List, Any, Tuple, Optional, Set
 from datetime import datetime, timedelta
 from pathlib import Path
+from dataclasses import dataclass
 import os
+import gzip
+import zlib
 import time
-import subprocess
+import functools
+import operator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import ct_status
 
 CACHE_DIR = Path("cache")
+TEMPLATE_DIR = Path(__file__).parent / "templates"
 BASE_URL = "https://storage.googleapis.com/crlite-filters-prod"
 DAYS_TO_FETCH = 14 
 FILES_PER_DAY = 2
+MAX_FETCH_WORKERS = 8
+FILES_TO_REVALIDATE = 2
 
-def get_file_dates() -> List[str]:
+# Matches the leading hour count of an age string (e.g., "1659h12m26.81016978s")
+_AGE_RE = re.compile(r'^(\d+)h')
+
+# Escapes text for HTML element content and quoted attribute values in one str.translate pass
+_ATTR_ESCAPE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'})
+
+_TEMPLATE_ENV = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+    autoescape=True,
+    auto_reload=False,
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+
+@dataclass(slots=True)
+class Status:
+    """Status of one issuer's CRL in one audit file."""
+    kind: str
+    num_revocations: Optional[int]
+    errors: str
+    age: str
+    sha256sum: str
+
+@functools.lru_cache(maxsize=1)
+def get_file_dates() -> Tuple[str, ...]:
     """
-    Generate list of dates for the last 45 days in YYYYMMDD format.
+    Generate tuple of dates for the last DAYS_TO_FETCH days in YYYYMMDD format, oldest first.
+    The result is computed once per process so that all callers agree on "today".
     """
     dates = []
     today = datetime.now()
-    for i in range(DAYS_TO_FETCH):
+    for i in reversed(range(DAYS_TO_FETCH)):
         date = today - timedelta(days=i)
         dates.append(date.strftime("%Y%m%d"))
-    return dates
+    return tuple(dates)
 
-def get_file_urls() -> List[Tuple[str, str]]:
+@functools.lru_cache(maxsize=1)
+def get_file_urls() -> Tuple[Tuple[str, str], ...]:
     """
-    Generate list of (date-suffix, url) tuples for all files to fetch.
-    Returns list of tuples containing (date-suffix, url) for each file.
+    Generate tuple of (date-suffix, url) tuples for all files to fetch.
+    Returns tuple of tuples containing (date-suffix, url) for each file, sorted by date-suffix.
     Example: ("20250610-1", "https://.../20250610-1/crl-audit.json")
     """
     urls = []
@@ -37,116 +76,232 @@ def get_file_urls() -> List[Tuple[str, str]]:
             date_suffix = f"{date}-{suffix}"
             url = f"{BASE_URL}/{date_suffix}/crl-audit.json"
             urls.append((date_suffix, url))
-    return urls
+    return tuple(urls)
 
 def get_cache_path(date_suffix: str) -> Path:
-    """Get the cache file path for a given date-suffix."""
-    return CACHE_DIR / f"{date_suffix}.json"
+    """Get the gzip-compressed cache file path for a given date-suffix."""
+    return CACHE_DIR / f"{date_suffix}.json.gz"
+
+def get_parsed_cache_path(cache_path: Path) -> Path:
+    """Get the path of the parsed-index file that sits next to a raw cache file."""
+    return cache_path.with_name(cache_path.name.removesuffix(".json.gz") + ".parsed.json")
 
-def fetch_json_data(url: str, cache_path: Optional[Path] = None) -> Dict[str, Any]:
+def get_validator_paths(cache_path: Path) -> Tuple[Path, Path]:
+    """Get the paths of the ETag and Last-Modified files for a raw cache file."""
+    stem = cache_path.name.removesuffix(".json.gz")
+    return cache_path.with_name(stem + ".etag"), cache_path.with_name(stem + ".lastmod")
+
+def download_to_cache(url: str, cache_path: Path, revalidate: bool = False,
+                      session: Optional[requests.Session] = None) -> bool:
     """
-    Fetch JSON data from a URL, optionally caching the result.
+    Download a file into the cache, replacing any previous copy atomically.
+    The file is stored gzip-compressed; a gzip-encoded response is kept as sent.
     
     Args:
-        url (str): URL to fetch JSON data from
-        cache_path (Optional[Path]): Path to cache the result
+        url (str): URL to download
+        cache_path (Path): Path to cache the file at
+        revalidate (bool): If the cache exists, send a conditional GET and
+            only download the body if the server copy has changed
+        session (Optional[requests.Session]): Session to fetch with, defaults to ct_status.get_session()
         
     Returns:
-        Dict[str, Any]: Parsed JSON data
+        bool: True if new contents were written, False if the cached copy was kept
         
     Raises:
         requests.RequestException: If the request fails
-        json.JSONDecodeError: If the response is not valid JSON
     """
-    if cache_path and cache_path.exists():
-        with open(cache_path, 'r') as f:
-            return json.load(f)
-    
-    response = requests.get(url)
-    response.raise_for_status()
-    data = response.json()
+    headers = {}
+    if cache_path.exists():
+        if not revalidate:
+            return False
+        etag_path, lastmod_path = get_validator_paths(cache_path)
+        if etag_path.exists():
+            headers['If-None-Match'] = etag_path.read_text()
+        if lastmod_path.exists():
+            headers['If-Modified-Since'] = lastmod_path.read_text()
     
-    if cache_path:
-        cache_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(cache_path, 'w') as f:
-            json.dump(data, f)
+    if session is None:
+        session = ct_status.get_session()
+    headers['Accept-Encoding'] = 'gzip'
+    with session.get(url, headers=headers, timeout=30, stream=True) as response:
+        response.raise_for_status()
+        if response.status_code == 304:
+            return False
+        if response.headers.get('Content-Encoding', '').strip().lower() == 'gzip':
+            # Keep the compressed body rather than decoding and re-compressing it
+            body = response.raw.read(decode_content=False)
+        else:
+            body = gzip.compress(response.content)
     
-    return data
+    # Write to a temporary file and move it into place, so an interrupted
+    # run never leaves a truncated cache file behind
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(".gz.tmp")
+    tmp_path.write_bytes(body)
+    os.replace(tmp_path, cache_path)
+    # The parsed index was derived from the previous contents
+    get_parsed_cache_path(cache_path).unlink(missing_ok=True)
+    for validator_path, header in zip(get_validator_paths(cache_path), ('ETag', 'Last-Modified')):
+        if response.headers.get(header):
+            validator_path.write_text(response.headers[header])
+        else:
+            validator_path.unlink(missing_ok=True)
+    return True
 
-def check_for_updates() -> List[Tuple[str, str]]:
+def list_cache_dir() -> Set[str]:
+    """Return the names of the files in the cache directory using a single scandir."""
+    try:
+        with os.scandir(CACHE_DIR) as it:
+            return {entry.name for entry in it if entry.is_file()}
+    except FileNotFoundError:
+        return set()
+
+def plan_files() -> Tuple[List[Tuple[str, str]], Set[Path], Tuple[Tuple[str, str], ...]]:
     """
-    Check which files need to be updated.
-    Returns list of (date-suffix, url) tuples for files that need updating.
+    Walk the expected files once and work out what to fetch, remove, and load.
+    The cache directory is listed with a single scandir rather than a stat per file.
+    Returns a tuple containing:
+        - list of (date-suffix, url) tuples for files that need updating
+        - set of cache paths that are not expected and should be removed
+        - tuple of (date-suffix, url) tuples sorted by date-suffix
     """
+    present = list_cache_dir()
     needs_update = []
+    expected_names = {ct_status.LATEST_CT_LOGS_CACHE.name}
     for date_suffix, url in get_file_urls():
         cache_path = get_cache_path(date_suffix)
-        if not cache_path.exists():
+        expected_names.add(cache_path.name)
+        expected_names.add(get_parsed_cache_path(cache_path).name)
+        expected_names.update(path.name for path in get_validator_paths(cache_path))
+        if cache_path.name not in present:
             needs_update.append((date_suffix, url))
-    return needs_update
-
-def update_files(needs_update: List[Tuple[str, str]]) -> None:
-    """Update the specified files and remove unexpected files from the cache."""
-    # Get all expected date_suffixes from get_file_urls()
-    expected_date_suffixes = {date_suffix for date_suffix, _ in get_file_urls()}
-    expected_files = {get_cache_path(date_suffix) for date_suffix in expected_date_suffixes}
-    cache_files = set(CACHE_DIR.glob("*"))
+    unexpected_files = {CACHE_DIR / name for name in present - expected_names}
+    return needs_update, unexpected_files, get_file_urls()
+
+def update_files(needs_update: List[Tuple[str, str]], unexpected_files: Set[Path], revalidate: bool = False) -> None:
+    """
+    Update the specified files and remove unexpected files from the cache.
+    With revalidate, files that are already cached are checked against the server.
+    """
     # Remove unexpected files
-    for file_path in cache_files - expected_files:
+    for file_path in unexpected_files:
         try:
             file_path.unlink()
             print(f"Removed unexpected file: {file_path}")
         except Exception as e:
             print(f"Error removing {file_path}: {e}")
 
-    # Update expected files
-    for date_suffix, url in needs_update:
-        print(f"Fetching {date_suffix}...")
-        cache_path = get_cache_path(date_suffix)
-        try:
-            fetch_json_data(url, cache_path)
-            print(f"Successfully updated {date_suffix}")
-        except Exception as e:
-            print(f"Error updating {date_suffix}: {e}")
+    # Update expected files concurrently; the workers share one pooled session so
+    # connections to the storage host are reused rather than re-handshaken
+    session = ct_status.get_session()
+    with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+        futures = {}
+        for date_suffix, url in needs_update:
+            print(f"Fetching {date_suffix}...")
+            future = executor.submit(download_to_cache, url, get_cache_path(date_suffix), revalidate, session)
+            futures[future] = date_suffix
+        for future in as_completed(futures):
+            date_suffix = futures[future]
+            try:
+                if future.result():
+                    print(f"Successfully updated {date_suffix}")
+                else:
+                    print(f"{date_suffix} is unchanged")
+            except Exception as e:
+                print(f"Error updating {date_suffix}: {e}")
+
+def parse_num_revocations(value: Any) -> Optional[int]:
+    """Coerce a NumRevocations value to int, or None if it is not a number."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_cache_file(cache_path: Path) -> List[Dict[str, Any]]:
+    """
+    Extract the fields used by the dashboard from a raw crl-audit cache file.
+    Entries are streamed one at a time so the whole document is never held in memory.
+    Returns a list of flat records, one per fresh entry.
+    """
+    records = []
+    with gzip.open(cache_path, 'rb') as f:
+        for entry in ijson.items(f, 'Entries.item', use_float=True):
+            if 'Not Fresh' in entry.get('Kind', 'N/A'):
+                continue
+            records.append({
+                'key': entry.get('Url', 'N/A'),
+                'url': entry.get('Url', ''),
+                'issuer': entry.get('IssuerSubject', 'N/A'),
+                'kind': entry.get('Kind', 'N/A'),
+                'num_revocations': entry.get('NumRevocations', '0'),
+                'errors': entry.get('Errors', ''),
+                'age': entry.get('Age', 'N/A'),
+                'sha256sum': entry.get('SHA256Sum', 'N/A')
+            })
+    return records
+
+def load_parsed_records(cache_path: Path) -> List[Dict[str, Any]]:
+    """
+    Load the parsed records for a raw cache file, reusing the parsed index
+    when it is at least as new as the raw file and rebuilding it otherwise.
+    """
+    parsed_path = get_parsed_cache_path(cache_path)
+    try:
+        if parsed_path.stat().st_mtime >= cache_path.stat().st_mtime:
+            with open(parsed_path, 'rb') as f:
+                return orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        pass
+
+    records = parse_cache_file(cache_path)
+    try:
+        with open(parsed_path, 'wb') as f:
+            f.write(orjson.dumps(records))
+    except OSError as e:
+        print(f"Error writing {parsed_path}: {e}")
+    return records
 
-def load_cached_data() -> Dict[str, Dict[str, Any]]:
+def load_cached_data(sorted_urls: Tuple[Tuple[str, str], ...]) -> Dict[str, Dict[str, Any]]:
     """
-    Load all cached data files.
+    Load all cached data files, in the order given by sorted_urls.
     Returns a dictionary mapping issuer subjects to their statuses in each file.
     """
     issuer_statuses = {}  # Maps issuer subject to dict of file statuses
     file_dates = []  # List of date-suffixes in order
     
     # First pass: collect all unique issuers and file dates
-    for date_suffix, url in sorted(get_file_urls()):
+    present = list_cache_dir()
+    for date_suffix, url in sorted_urls:
         file_dates.append(date_suffix)
         cache_path = get_cache_path(date_suffix)
-        if cache_path.exists():
+        if cache_path.name in present:
             try:
-                with open(cache_path, 'r') as f:
-                    data = json.load(f)
-                    for entry in data.get('Entries', []):
-                        if 'Not Fresh' in entry.get('Kind', 'N/A'):
-                            continue
-                        key = entry.get('Url', 'N/A')
-                        if key not in issuer_statuses:
-                            issuer_statuses[key] = {
-                                'url': entry.get('Url', ''),
-                                'issuer': entry.get('IssuerSubject', 'N/A'),
-                                'statuses': {}
-                            }
-                        issuer_statuses[key]['statuses'][date_suffix] = {
-                            'kind': entry.get('Kind', 'N/A'),
-                            'num_revocations': entry.get('NumRevocations', '0'),
-                            'errors': entry.get('Errors', ''),
-                            'age': entry.get('Age', 'N/A'),
-                            'sha256sum': entry.get('SHA256Sum', 'N/A')
+                for record in load_parsed_records(cache_path):
+                    key = record['key']
+                    issuer = issuer_statuses.get(key)
+                    if issuer is None:
+                        issuer = issuer_statuses[key] = {
+                            'url': record['url'],
+                            'issuer': record['issuer'],
+                            'statuses': {}
                         }
+                    issuer['statuses'][date_suffix] = Status(
+                        record['kind'],
+                        parse_num_revocations(record['num_revocations']),
+                        record['errors'],
+                        record['age'],
+                        record['sha256sum']
+                    )
+            except (ijson.JSONError, gzip.BadGzipFile, EOFError, zlib.error) as e:
+                # Remove it so that the next run downloads it again
+                print(f"Error loading {date_suffix}, removing corrupt cache file: {e}")
+                cache_path.unlink(missing_ok=True)
             except Exception as e:
                 print(f"Error loading {date_suffix}: {e}")
     
     return issuer_statuses, file_dates
 
+@functools.lru_cache(maxsize=1024)
 def is_valid(kind: str) -> Tuple[bool, str]:
     """
     Determine if an entry is valid and its status type.
@@ -167,6 +322,11 @@ def is_valid(kind: str) -> Tuple[bool, str]:
         return False, 'error'
 
 
+def _age_hours(age: str) -> int:
+    """Return the leading hour count of an age string, or 0 if it has none."""
+    match = _AGE_RE.match(age)
+    return int(match.group(1)) if match else 0
+
 def get_status_color(kind: str, age: str) -> str:
     """
     Determine the background color based on the entry kind.
@@ -178,214 +338,137 @@ def get_status_color(kind: str, age: str) -> str:
     Returns:
         str: CSS color value
     """
+    # Ages are effectively unique per cell, so memoize on whether the entry is old instead
+    return _status_color(kind, _age_hours(age) > 336)  # More than 2 weeks
+
+@functools.lru_cache(maxsize=1024)
+def _status_color(kind: str, is_old: bool) -> str:
+    """Return the background color for an entry kind and whether the entry is old."""
     _, status = is_valid(kind)
     if status == 'valid':
-        color = '#90EE90'
-        try:
-            # Extract hours from age string (e.g., "1659h12m26.81016978s")
-            hours = int(age.split('h')[0])
-            if hours > 336:  # More than 2 weeks
-                color = '#FFEB3B'  # Light yellow for old valid entries
-        except (ValueError, IndexError):
-            pass
-        return color
+        if is_old:
+            return '#FFEB3B'  # Light yellow for old valid entries
+        return '#90EE90'
     elif status == 'warning':
         return '#FFEB3B'  # Light yellow
     else:
         return '#FFB6C1'  # Light red
 
 
+def build_heatmap_row(statuses: Dict[str, Status], file_dates: List[str]) -> Tuple[List[str], List[int], List[Optional[Tuple]]]:
+    """
+    Compute the cell colors, revocation arrows and hover data for one issuer's row.
+    Hover data is a (kind, errors, revocations, rev_change, age, sha256sum) tuple per cell.
+    Arrows are 1 or -1 where the revocation count moved by more than 250 since
+    the previous file, and 0 elsewhere; a missing file resets the comparison.
+    """
+    row_colors = []
+    row_arrows = []
+    row_cell_data = []
+    prev_revocations = None
+    for date_suffix in file_dates:
+        status = statuses.get(date_suffix)
+        if status is None:
+            row_colors.append('#f0f0f0')
+            row_arrows.append(0)
+            row_cell_data.append(None)
+            prev_revocations = None
+            continue
+        curr_revocations = status.num_revocations
+        rev_change = 0
+        arrow = 0
+        if prev_revocations is not None and curr_revocations is not None:
+            rev_change = curr_revocations - prev_revocations
+            if abs(rev_change) > 250:
+                arrow = 1 if rev_change > 0 else -1
+        prev_revocations = curr_revocations
+        row_colors.append(get_status_color(status.kind, status.age))
+        row_arrows.append(arrow)
+        # Positional so the inlined JSON does not repeat the field names for every cell
+        row_cell_data.append((status.kind, status.errors, curr_revocations, rev_change, status.age, status.sha256sum))
+    return row_colors, row_arrows, row_cell_data
+
+def _script_json(obj: Any) -> Markup:
+    """Serialize obj as JSON that is safe to inline in a <script> element."""
+    # Escape "</" so that string values cannot terminate the script element
+    return Markup(orjson.dumps(obj).decode().replace('</', '<\\/'))
+
 def create_heatmap_html(issuer_statuses: Dict[str, Dict[str, Any]], file_dates: List[str]) -> str:
     """Create a heatmap visualization using CSS Grid."""
+    # Compute each row once; both the sort and the template read from it
+    rows = {issuer: build_heatmap_row(data['statuses'], file_dates) for issuer, data in issuer_statuses.items()}
+
     # Sort issuers by priority of issues, then by URL
-    def sort_key(issuer):
-        data = issuer_statuses[issuer]
+    def sort_key(issuer, data):
         # Priority levels: 0=no issues, 1=arrows, 2=missing data, 3=warnings, 4=errors
-        priority = 0
-        has_error = False
-        has_warning = False
-        has_arrow = False
-        prev_revocations = None
-        
-        # Check for missing data
-        if len(data['statuses']) < len(file_dates):
-            priority = 2
-        
-        # Check for warnings, errors, and arrows
-        for status in data['statuses'].values():
-            kind = status.get('kind', '')
-            age = status.get('age', '')
-            bg_color = get_status_color(kind, age)
-            if bg_color == '#FFB6C1':  # Red
-                has_error = True
-            elif bg_color == '#FFEB3B':  # Yellow
-                has_warning = True
-            
-            # Check for significant revocation count changes
-            curr_revocations = status.get('num_revocations', 0)
-            if prev_revocations is not None and isinstance(curr_revocations, int) and isinstance(prev_revocations, int):
-                if abs(curr_revocations - prev_revocations) > 250:
-                    has_arrow = True
-            prev_revocations = curr_revocations
-        
-        # Set priority based on most severe issue
-        if has_error:
+        # Arrows take precedence over missing data, and each check only runs if
+        # no more severe issue was found
+        row_colors, row_arrows, _ = rows[issuer]
+        colors = set(row_colors)
+        if '#FFB6C1' in colors:  # Red
             priority = 4
-        elif has_warning:
+        elif '#FFEB3B' in colors:  # Yellow
             priority = 3
-        elif has_arrow:
+        elif any(row_arrows):
             priority = 1
+        elif len(data['statuses']) < len(file_dates):
+            priority = 2
+        else:
+            priority = 0
         
         # Sort by priority (descending) then by URL
         return (-priority, data['url'].lower())
     
-    sorted_issuers = sorted(issuer_statuses.keys(), key=sort_key)
+    # Decorate each issuer with its key once, sort on the keys, then undecorate
+    decorated = [(sort_key(issuer, data), issuer) for issuer, data in issuer_statuses.items()]
+    decorated.sort(key=operator.itemgetter(0))
+    sorted_issuers = [issuer for _, issuer in decorated]
     
     if not sorted_issuers:
         return "<div>No warnings or errors found in any URLs.</div>"
     
-    # Create the grid container with CSS Grid
-    html = """
-    <div class="heatmap-container">
-        <h2>CRL Ingestion Status</h2>
-        <div class="info-panel">
-            <div class="info-content">
-                <div class="info-title">Hover over a cell to see details</div>
-                <div class="info-details"></div>
-            </div>
-        </div>
-        <div class="heatmap-header">
-        <div class="date-header"></div>\n"""
-    
-    # Add date headers
-    for date_suffix in file_dates:
-        html += f'<div class="date-header">{date_suffix}</div>\n'
-    
-    html += '</div>\n<div class="heatmap-grid">\n'
-    
-    # Build JS tables for issuers and dates
-    row_issuers_js = 'window.rowIssuersByIdx = ' + json.dumps({i: issuer_statuses[issuer]['issuer'] for i, issuer in enumerate(sorted_issuers)}) + ';'
-    col_dates_js = 'window.colDatesByIdx = ' + json.dumps({i: date for i, date in enumerate(file_dates)}) + ';'
-    html += f'<script>{row_issuers_js}{col_dates_js}</script>'
-
-    # Add rows for each issuer
-    for row_idx, issuer in enumerate(sorted_issuers):
+    issuers = []
+    for issuer in sorted_issuers:
         url = issuer_statuses[issuer]['url']
         display_url = url[:40] + ('...' if len(url) > 40 else '')
-        statuses = issuer_statuses[issuer]['statuses']
-        html += f'<div class="url-column"><a href="{url}" target="_blank">{display_url}</a></div>\n'
-        prev_revocations = None
-        for col_idx, date_suffix in enumerate(file_dates):
-            if date_suffix in statuses:
-                status = statuses[date_suffix]
-                kind = status['kind']
-                age = status['age']
-                bg_color = get_status_color(kind, age)
-                curr_revocations = status.get('num_revocations', 0)
-                rev_change = 0
-                display_text = ''
-                if prev_revocations is not None and isinstance(curr_revocations, int) and isinstance(prev_revocations, int):
-                    rev_change = curr_revocations - prev_revocations
-                    if abs(rev_change) > 250:
-                        if rev_change > 0:
-                            display_text = '&#9650;'
-                        elif rev_change < 0:
-                            display_text = '&#9660;'
-                prev_revocations = curr_revocations
-                cell_data = {
-                    "kind": kind,
-                    "errors": status.get("errors", ""),
-                    "revocations": curr_revocations,
-                    "rev_change": rev_change,
-                    "age": status.get("age", "N/A"),
-                    "sha256sum": status.get("sha256sum", "xxx"),
-                    "row_idx": row_idx,
-                    "col_idx": col_idx
-                }
-                cell_data_json = json.dumps(cell_data).replace("'", "&#39;")
-                html += f'''
-                <div class="status-cell" 
-                     style="background-color: {bg_color};"
-                     data-cell='{cell_data_json}'>{display_text}</div>
-                '''
-            else:
-                html += '<div class="status-cell" style="background-color: #f0f0f0;" data-cell=\'{"row_idx": ' + str(row_idx) + ', "col_idx": ' + str(col_idx) + '}\'></div>\n'
-                prev_revocations = None
-    
-    html += """</div></div>
-    <script>
-    document.addEventListener('DOMContentLoaded', function() {
-        const infoPanel = document.querySelector('.info-panel');
-        const infoDetails = document.querySelector('.info-details');
-        const infoTitle = document.querySelector('.info-title');
-        const cells = document.querySelectorAll('.status-cell');
-        
-        // Update panel position on mouse move
-        document.addEventListener('mousemove', function(e) {
-            // Add offset to prevent panel from covering the cursor
-            const x = e.clientX + 15;
-            const y = e.clientY + 15;
-            
-            // Keep panel within viewport bounds
-            const panelRect = infoPanel.getBoundingClientRect();
-            const maxX = window.innerWidth - panelRect.width;
-            const maxY = window.innerHeight - panelRect.height;
-            
-            infoPanel.style.left = Math.min(x, maxX) + 'px';
-            infoPanel.style.top = Math.min(y, maxY) + 'px';
-        });
-        
-        cells.forEach(cell => {
-            cell.addEventListener('mouseenter', function() {
-                const data = JSON.parse(this.dataset.cell);
-                if (data.kind) {
-                    const issuer = window.rowIssuersByIdx[data.row_idx] || 'N/A';
-                    const date = window.colDatesByIdx[data.col_idx] || 'N/A';
-                    let html = `<div class="info-row"><strong>Date:</strong> ${date}</div>`;
-                    html += `<div class="info-row"><strong>Sha256:</strong> ${data.sha256sum}</div>`;
-                    html += `<div class="info-row"><strong>Age:</strong> ${data.age}</div>`;
-                    html += `<div class="info-row"><strong>Kind:</strong> ${data.kind}</div>`;
-                    if (data.revocations) {
-                        let revText = `<strong>Revocations:</strong> ${data.revocations}`;
-                        if (data.rev_change !== null) {
-                            const changeText = data.rev_change > 0 ? 
-                                ` (+${data.rev_change})` : 
-                                ` (${data.rev_change})`;
-                            revText += changeText;
-                        }
-                        html += `<div class="info-row">${revText}</div>`;
-                    }
-                    if (data.errors) {
-                        html += `<div class="info-row"><strong>Errors:</strong> ${data.errors}</div>`;
-                    }
-                    infoDetails.innerHTML = html;
-                    infoTitle.textContent = issuer;
-                    infoPanel.style.display = 'block';
-                } else {
-                    infoDetails.innerHTML = `<div class="info-row">No data available for ${data.row_idx}, ${data.col_idx}</div>`;
-                    infoTitle.textContent = 'No Data';
-                    infoPanel.style.display = 'block';
-                }
-            });
-            
-            cell.addEventListener('mouseleave', function() {
-                infoPanel.style.display = 'none';
-                infoDetails.innerHTML = '';
-                infoTitle.textContent = 'Hover over a cell to see details';
-            });
-        });
-    });
-    </script>
+        issuers.append((url, display_url))
+    colors = [rows[issuer][0] for issuer in sorted_issuers]
+    arrows = [rows[issuer][1] for issuer in sorted_issuers]
+    cell_data_matrix = [rows[issuer][2] for issuer in sorted_issuers]
+
+    return _TEMPLATE_ENV.get_template('heatmap.html.j2').render(
+        file_dates=file_dates,
+        issuers=issuers,
+        colors=colors,
+        arrows=arrows,
+        row_issuers_json=_script_json([issuer_statuses[issuer]['issuer'] for issuer in sorted_issuers]),
+        col_dates_json=_script_json(file_dates),
+        cell_data_json=_script_json(cell_data_matrix),
+    )
+
+def write_issuer_statuses(issuer_statuses: Dict[str, Dict[str, Any]], path: Path) -> None:
+    """
+    Write issuer_statuses as indented JSON, one issuer at a time, so the
+    serialized form of the whole mapping is never held in memory at once.
+    The output is identical to orjson.dumps(issuer_statuses, option=OPT_INDENT_2).
     """
-    return html
+    with open(path, 'wb') as f:
+        if not issuer_statuses:
+            f.write(b"{}")
+            return
+        separator = b"{"
+        for key, value in issuer_statuses.items():
+            # Nest each value one level deeper; JSON strings never contain raw newlines
+            value_json = orjson.dumps(value, option=orjson.OPT_INDENT_2).replace(b"\n", b"\n  ")
+            f.write(separator + b"\n  " + orjson.dumps(key) + b": " + value_json)
+            separator = b","
+        f.write(b"\n}")
 
 def get_ct_log_data() -> List[Dict[str, Any]]:
-    """Get CT log data by running ct_status.py."""
+    """Get CT log data from ct_status, in-process."""
     try:
-        result = subprocess.run(['python3', 'ct_status.py'], 
-                              capture_output=True, text=True, check=True)
-        return json.loads(result.stdout)
-    except (subprocess.CalledProcessError, json.JSONDecodeError) as e:
+        return ct_status.get_ct_log_data()
+    except Exception as e:
         print(f"Error getting CT log data: {e}", file=sys.stderr)
         return []
 
@@ -394,7 +477,7 @@ def create_ct_log_table(ct_logs: List[Dict[str, Any]]) -> str:
     if not ct_logs:
         return "<div>No CT log data available.</div>"
     
-    html = """
+    parts = ["""
     <div class="ct-log-table">
         <h2>CT Log Ingestion Status</h2>
         <table>
@@ -407,7 +490,7 @@ def create_ct_log_table(ct_logs: List[Dict[str, Any]]) -> str:
                 </tr>
             </thead>
             <tbody>
-    """
+    """]
     
     # Sort by time difference (if available) and then by URL
     def parse_time_diff(time_str):
@@ -432,7 +515,7 @@ def create_ct_log_table(ct_logs: List[Dict[str, Any]]) -> str:
     sorted_logs = sorted(ct_logs, key=sort_key, reverse=True)
     
     for log in sorted_logs:
-        url = log['url']
+        url = log['url'].translate(_ATTR_ESCAPE)
         entry_lag = log['entry_lag']
         time_diff = log['time_diff']
         tree_size = log['tree_size']
@@ -453,32 +536,39 @@ def create_ct_log_table(ct_logs: List[Dict[str, Any]]) -> str:
             else:
                 row_class = 'good-row'
         
-        html += f'<tr class="{row_class}">'
-        html += f'<td><a href="https://{url}" target="_blank">{url}</a></td>'
-        html += f'<td class="number-cell">{format_number(tree_size)}</td>'
-        html += f'<td class="number-cell">{format_number(entry_lag)}</td>'
-        html += f'<td>{time_diff}</td>'
+        parts.append(f'<tr class="{row_class}">')
+        parts.append(f'<td><a href="https://{url}" target="_blank">{url}</a></td>')
+        parts.append(f'<td class="number-cell">{format_number(tree_size)}</td>')
+        parts.append(f'<td class="number-cell">{format_number(entry_lag)}</td>')
+        parts.append(f'<td>{time_diff}</td>')
         if error:
-            html += f'<td class="error-message">{error}</td>'
-        html += '</tr>\n'
+            parts.append(f'<td class="error-message">{str(error).translate(_ATTR_ESCAPE)}</td>')
+        parts.append('</tr>\n')
     
-    html += """
+    parts.append("""
             </tbody>
         </table>
     </div>
-    """
-    return html
+    """)
+    return "".join(parts)
 
 def main() -> None:
     """Main entry point of the application."""
+    parser = argparse.ArgumentParser(description="Build the CRLite CT log and CRL ingestion dashboard.")
+    parser.add_argument("--revalidate", action="store_true",
+                        help=f"re-check the {FILES_TO_REVALIDATE} most recent cached files with a conditional GET")
+    args = parser.parse_args()
+
     # Check for files that need updating
-    needs_update = check_for_updates()
+    needs_update, unexpected_files, sorted_urls = plan_files()
+    if args.revalidate:
+        needs_update += [pair for pair in sorted_urls[-FILES_TO_REVALIDATE:] if pair not in needs_update]
     
     if needs_update:
-        update_files(needs_update)
+        update_files(needs_update, unexpected_files, args.revalidate)
     
     # Load all cached data
-    issuer_statuses, file_dates = load_cached_data()
+    issuer_statuses, file_dates = load_cached_data(sorted_urls)
     
     if not issuer_statuses:
         print("No data available. Please run the script again to download the files.")
@@ -487,172 +577,18 @@ def main() -> None:
     # Get CT log data
     ct_logs = get_ct_log_data()
 
-    # Start building the HTML output
-    html_output = """
-    <html>
-    <head>
-        <title>CRLite CT Log and CRL Ingestion Vibes</title>
-        <style>
-            body {
-                font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
-                margin: 20px;
-                font-size: 13px;  /* Set base font size to match heatmap */
-            }
-            .heatmap-container {
-                display: flex;
-                flex-direction: column;
-                gap: 0;  /* Remove gap between header and grid */
-                background-color: #ddd;
-                padding: 1px;
-                border-radius: 4px;
-                overflow: auto;
-                max-width: fit-content;
-            }
-            .info-panel {
-                background-color: white;
-                border: 1px solid #ddd;
-                border-radius: 4px;
-                padding: 12px;
-                box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-                position: fixed;
-                pointer-events: none;  /* Allow clicking through the panel */
-                max-width: 500px;
-                z-index: 1000;
-            }
-            .info-title {
-                font-weight: bold;
-                margin-bottom: 8px;
-                color: #333;
-            }
-            .info-details {
-                font-size: 14px;
-            }
-            .info-row {
-                margin-bottom: 4px;
-            }
-            .info-row:last-child {
-                margin-bottom: 0;
-            }
-            .info-row strong {
-                color: #666;
-                margin-right: 4px;
-            }
-            .heatmap-header {
-                display: grid;
-                grid-template-columns: minmax(200px, auto) repeat(""" + str(len(file_dates)) + """, 20px);
-                background: #fafafa;
-            }
-            .heatmap-grid {
-                display: grid;
-                grid-template-columns: minmax(200px, auto) repeat(""" + str(len(file_dates)) + """, 20px);
-                background: #fff;
-            }
-            .url-column {
-                padding: 2px 6px;
-                border: 1px solid #eee;
-                background: #fff;
-                font-size: 13px;
-                word-break: break-all;
-            }
-            .status-cell {
-                width: 20px;
-                height: 20px;
-                border: 1px solid #eee;
-                text-align: center;
-                font-size: 13px;
-                background: inherit;
-                padding: 0;
-                margin: 0;
-            }
-            .date-header {
-                font-size: 12px;
-                text-align: center;
-                padding: 2px 0;
-                border: 1px solid #eee;
-                background: #fafafa;
-                writing-mode: vertical-rl;
-                transform: rotate(180deg);
-                height: 100px;
-                white-space: nowrap;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-            }
-            h1, h2 {
-                color: #333;
-                margin-bottom: 20px;
-                font-size: 24px;  /* Consistent heading size */
-            }
-            h2 {
-                margin-top: 40px;
-            }
-            a {
-                color: #0066cc;
-                text-decoration: none;
-            }
-            a:hover {
-                text-decoration: underline;
-            }
-            /* CT Log table styles */
-            .ct-log-table {
-                margin-top: 40px;
-                margin-bottom: 40px;
-            }
-            .ct-log-table table {
-                border-collapse: collapse;
-                width: 100%;
-                max-width: 1200px;
-                margin-top: 10px;
-                font-size: 13px;
-            }
-            .ct-log-table th, .ct-log-table td {
-                padding: 8px;
-                text-align: left;
-                border: 1px solid #ddd;
-            }
-            .ct-log-table .number-cell {
-                text-align: right;
-                font-family: monospace;
-            }
-            .ct-log-table .error-row {
-                background-color: #ffebee;  /* Light red */
-            }
-            .ct-log-table .warning-row {
-                background-color: #fff3e0;  /* Light orange */
-            }
-            .ct-log-table .notice-row {
-                background-color: #fffde7;  /* Light yellow */
-            }
-            .ct-log-table .good-row {
-                background-color: #e8f5e9;  /* Light green */
-            }
-            .ct-log-table .error-message {
-                color: #d32f2f;
-                font-style: italic;
-            }
-        </style>
-    </head>
-    <body>
-    """
-    
-    # Add the CT log table
-    html_output += create_ct_log_table(ct_logs)
-
-    # Add the heatmap
-    html_output += create_heatmap_html(issuer_statuses, file_dates)
-
-    # Close the HTML tags
-    html_output += """
-    </body>
-    </html>
-    """
+    # Render the page around the CT log table and the heatmap
+    html_output = _TEMPLATE_ENV.get_template('page.html.j2').render(
+        n_dates=len(file_dates),
+        ct_log_table=Markup(create_ct_log_table(ct_logs)),
+        heatmap=Markup(create_heatmap_html(issuer_statuses, file_dates)),
+    )
 
     # Write the HTML output to a file
     with open("output.html", "w", encoding="utf-8") as f:
         f.write(html_output)
     # Write issuer_statuses to JSON file
-    with open("issuer_statuses.json", "w", encoding="utf-8") as f:
-        json.dump(issuer_statuses, f, indent=4)
+    write_issuer_statuses(issuer_statuses, Path("issuer_statuses.json"))
 
 
 if __name__ == "__main__":